@@ -0,0 +1,103 @@
+import functools
+import logging
+from typing import Any, Dict, Optional
+
+from livekit.agents import (
+    Agent,
+    AgentSession,
+    JobContext,
+    JobProcess,
+    MetricsCollectedEvent,
+    RoomInputOptions,
+    metrics,
+    tts,
+)
+from livekit.plugins import deepgram, google, noise_cancellation
+from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+from common_prewarm import get_vad
+from turn_latency import TurnLatencyTracker
+
+# -------------------------------------------------- #
+#     Shared Prewarm + Session Wiring For Agents     #
+# -------------------------------------------------- #
+
+
+def prewarm_plugins(
+    proc: JobProcess,
+    tts_client: tts.TTS,
+    *,
+    stt_kwargs: Optional[Dict[str, Any]] = None,
+    llm_kwargs: Optional[Dict[str, Any]] = None,
+) -> None:
+    proc.userdata["vad_model"] = get_vad()
+    # plugin clients are stateless between sessions, so build them once per
+    # worker process; the turn detector needs a job context and stays per-session
+    proc.userdata["stt"] = deepgram.STT(model="nova-3", **(stt_kwargs or {}))
+    proc.userdata["llm"] = google.LLM(model="gemini-2.5-flash", **(llm_kwargs or {}))
+    proc.userdata["tts"] = tts_client
+
+
+def _collect_metrics(
+    usage: metrics.UsageCollector,
+    latency: TurnLatencyTracker,
+    ev: MetricsCollectedEvent,
+) -> None:
+    metrics.log_metrics(ev.metrics)
+    usage.collect(ev.metrics)
+    latency.collect(ev.metrics)
+
+
+def make_session(proc: JobProcess, **kwargs: Any) -> AgentSession:
+    """Build an AgentSession from the clients stored by `prewarm_plugins`."""
+    return AgentSession(
+        stt=proc.userdata["stt"],
+        llm=proc.userdata["llm"],
+        tts=proc.userdata["tts"],
+        turn_detection=MultilingualModel(),
+        vad=proc.userdata["vad_model"],
+        preemptive_generation=True,
+        **kwargs,
+    )
+
+
+async def run_session(
+    ctx: JobContext,
+    session: AgentSession,
+    agent: Agent,
+    *,
+    name: str,
+    logger: logging.Logger,
+) -> None:
+    """
+    Attach metrics and latency logging to `session`, start it in the job's
+    room with noise cancellation and connect. The session's usage summary is
+    logged as "<name> usage summary" on `logger` at shutdown.
+    """
+    usage = metrics.UsageCollector()
+    latency = TurnLatencyTracker()
+
+    session.on("metrics_collected", functools.partial(_collect_metrics, usage, latency))
+    session.on("user_state_changed", latency.on_user_state_changed)
+    session.on("user_input_transcribed", latency.on_user_input_transcribed)
+
+    async def show_usage():
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s usage summary: %s, %s",
+                name,
+                usage.get_summary(),
+                latency.ttfs_summary(),
+            )
+
+    ctx.add_shutdown_callback(show_usage)
+
+    await session.start(
+        agent=agent,
+        room=ctx.room,
+        room_input_options=RoomInputOptions(
+            noise_cancellation=noise_cancellation.BVC(),
+        ),
+    )
+
+    await ctx.connect()
@@ -1,27 +1,27 @@
+import asyncio
 import logging
 import os
+import sys
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-import json
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
-    tokenize,
     function_tool,
     RunContext,
 )
 
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from json_io import CoalescingFlusher, write_json_atomic
+from sentence_chunking import ClauseTokenizer
 
 # -------------------------------------------------- #
 #                    Setup                           #
@@ -32,32 +32,92 @@ load_dotenv(".env.local")
 # -------------------------------------------------- #
 #         Improv Scenarios (Static List)             #
 # -------------------------------------------------- #
-SCENARIOS = [
+SCENARIOS = (
     "You are a time-travelling tour guide explaining smartphones to someone from the 1800s.",
     "You are a waiter who must calmly tell a customer their order escaped the kitchen.",
     "You are trying to return a clearly cursed object to a skeptical shopkeeper.",
     "You are a detective interrogating a penguin who refuses to answer questions.",
     "You are a wizard whose wand is malfunctioning during a very serious council meeting.",
-]
+)
+_N_SCENARIOS = len(SCENARIOS)
+
+_PHASE_INTRO = sys.intern("intro")
+_PHASE_AWAITING = sys.intern("awaiting_improv")
+_PHASE_REACTING = sys.intern("reacting")
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATE_FILE = os.path.join(BASE_DIR, "improv_state.json")
 
-STATE_FILE = "improv_state.json"
+# hash of the last payload written, so unchanged state is not rewritten
+_last_saved_hash: Optional[int] = None
 
-def save_state_to_json(state: dict):
+
+async def save_state_to_json(state: dict):
+    global _last_saved_hash
     try:
-        with open(STATE_FILE, "w") as f:
-            json.dump(state, f, indent=4)
+        payload = orjson.dumps(state, option=orjson.OPT_INDENT_2)
+        payload_hash = hash(payload)
+        if payload_hash == _last_saved_hash:
+            return
+        await asyncio.to_thread(write_json_atomic, STATE_FILE, payload)
+        _last_saved_hash = payload_hash
         logger.info("State saved to improv_state.json")
     except Exception as e:
-        logger.error(f"Failed to save state: {e}")
+        logger.error("Failed to save state: %s", e)
+
+
+# Tools mark the state dirty and it is written once the burst of tool calls in
+# a turn has settled.
+STATE_FLUSH_DELAY = 0.1
+_pending_state: Optional[dict] = None
+
+
+async def _write_pending_state():
+    await save_state_to_json(_pending_state)
+
+
+_state_flusher = CoalescingFlusher(_write_pending_state, STATE_FLUSH_DELAY)
+
+
+def mark_state_dirty(state: dict):
+    global _pending_state
+    _pending_state = state
+    _state_flusher.mark_dirty()
+
+
+async def flush_pending_state():
+    """Write out any state still waiting on the flush delay."""
+    await _state_flusher.flush_now()
 
 
 # -------------------------------------------------- #
 #     Tools — Maintain Game State in Backend         #
 # -------------------------------------------------- #
+def _bump_state_version(userdata: Dict[str, Any]):
+    userdata["improv_state_version"] = userdata.get("improv_state_version", 0) + 1
+
+
 @function_tool
 async def get_state(ctx: RunContext) -> Dict[str, Any]:
-    """Returns the current improv game state."""
-    return ctx.session.userdata.get("improv_state")
+    """Returns a summary of the current improv game state."""
+    userdata = ctx.session.userdata
+    version = userdata.get("improv_state_version", 0)
+
+    # the summary only changes when a round starts or finishes
+    cached = userdata.get("improv_state_summary")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    state = userdata["improv_state"]
+    summary = {
+        "player_name": state["player_name"],
+        "current_round": state["current_round"],
+        "max_rounds": state["max_rounds"],
+        "rounds_count": len(state["rounds"]),
+        "phase": state["phase"],
+    }
+    userdata["improv_state_summary"] = (version, summary)
+    return summary
 
 
 @function_tool
@@ -65,17 +125,17 @@ async def start_new_round(ctx: RunContext) -> Dict[str, Any]:
     state = ctx.session.userdata["improv_state"]
 
     state["current_round"] += 1
-    idx = state["current_round"] - 1
-    state["phase"] = "awaiting_improv"
+    state["phase"] = _PHASE_AWAITING
 
-    scenario = SCENARIOS[idx % len(SCENARIOS)]
+    scenario = SCENARIOS[(state["current_round"] - 1) % _N_SCENARIOS]
     state["rounds"].append({
         "scenario": scenario,
         "host_reaction": None,
     })
+    _bump_state_version(ctx.session.userdata)
 
-    # NEW → Save after modification
-    save_state_to_json(state)
+    # NEW → Save after modification (coalesced with other tool calls)
+    mark_state_dirty(state)
 
     return {
         "round_number": state["current_round"],
@@ -89,10 +149,11 @@ async def finish_round(ctx: RunContext, reaction: str) -> Dict[str, Any]:
     round_index = state["current_round"] - 1
 
     state["rounds"][round_index]["host_reaction"] = reaction
-    state["phase"] = "reacting"
+    state["phase"] = _PHASE_REACTING
+    _bump_state_version(ctx.session.userdata)
 
-    # NEW → Save after modification
-    save_state_to_json(state)
+    # NEW → Save after modification (coalesced with other tool calls)
+    mark_state_dirty(state)
 
     return {
         "round_number": state["current_round"],
@@ -103,41 +164,42 @@ async def finish_round(ctx: RunContext, reaction: str) -> Dict[str, Any]:
 # -------------------------------------------------- #
 #             Improv Battle Game Agent               #
 # -------------------------------------------------- #
+IMPROV_INSTRUCTIONS = (
+    "You are the high-energy host of a wild TV improv competition called **Improv Battle**.\n"
+    "Your job:\n"
+    "- Run a fun 3-round improv contest.\n"
+    "- Keep the tone witty, punchy, and playful.\n"
+    "- You may tease the player lightly but never be abusive.\n"
+    "- You MUST follow state provided via tools.\n"
+    "- Randomly vary reactions: supportive, neutral, or mildly critical.\n\n"
+    "- The participant name is Sam.\n\n"
+
+    "=== GAME FLOW ===\n"
+    "PHASE: intro → awaiting_improv → reacting → done\n\n"
+
+    "**Intro Phase:**\n"
+    "- Greet the player.\n"
+    "- Explain the rules.\n"
+    "- Ask their name if missing.\n"
+    "- When ready, call `start_new_round()`.\n\n"
+
+    "**Awaiting Improv:**\n"
+    "- Present the scenario to the player.\n"
+    "- Tell them to improvise.\n"
+    "- When the user stops or says 'end scene', call `finish_round()` with a reaction.\n"
+    "- After reaction, if rounds < max_rounds → start_new_round().\n"
+    "- Otherwise, close the show.\n\n"
+
+    "**Done Phase:**\n"
+    "- Thank the player.\n"
+    "- End the show politely.\n"
+)
+
+
 class ImprovAgent(Agent):
     def __init__(self):
-        instructions = (
-            "You are the high-energy host of a wild TV improv competition called **Improv Battle**.\n"
-            "Your job:\n"
-            "- Run a fun 3-round improv contest.\n"
-            "- Keep the tone witty, punchy, and playful.\n"
-            "- You may tease the player lightly but never be abusive.\n"
-            "- You MUST follow state provided via tools.\n"
-            "- Randomly vary reactions: supportive, neutral, or mildly critical.\n\n"
-            "- The participant name is Sam.\n\n"
-
-            "=== GAME FLOW ===\n"
-            "PHASE: intro → awaiting_improv → reacting → done\n\n"
-
-            "**Intro Phase:**\n"
-            "- Greet the player.\n"
-            "- Explain the rules.\n"
-            "- Ask their name if missing.\n"
-            "- When ready, call `start_new_round()`.\n\n"
-
-            "**Awaiting Improv:**\n"
-            "- Present the scenario to the player.\n"
-            "- Tell them to improvise.\n"
-            "- When the user stops or says 'end scene', call `finish_round()` with a reaction.\n"
-            "- After reaction, if rounds < max_rounds → start_new_round().\n"
-            "- Otherwise, close the show.\n\n"
-
-            "**Done Phase:**\n"
-            "- Thank the player.\n"
-            "- End the show politely.\n"
-        )
-
         super().__init__(
-            instructions=instructions,
+            instructions=IMPROV_INSTRUCTIONS,
             tools=[get_state, start_new_round, finish_round],
         )
 
@@ -145,20 +207,20 @@ class ImprovAgent(Agent):
 # -------------------------------------------------- #
 #               Voice: Murf Falcon (India)           #
 # -------------------------------------------------- #
-def pick_voice(agent: ImprovAgent):
+def pick_voice():
     return murf.TTS(
         voice="en-IN-Anisha",
         style="Conversational",
-        tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+        tokenizer=ClauseTokenizer(),
         text_pacing=True,
     )
 
 
 # -------------------------------------------------- #
-#                Prewarm VAD Model                   #
+#           Prewarm VAD + Plugin Clients             #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    prewarm_plugins(proc, pick_voice())
 
 
 # -------------------------------------------------- #
@@ -173,42 +235,15 @@ async def entrypoint(ctx: JobContext):
         "current_round": 0,
         "max_rounds": 3,
         "rounds": [],
-        "phase": "intro",
+        "phase": _PHASE_INTRO,
     }
 
-    agent = ImprovAgent()
+    session = make_session(ctx.proc, userdata=ctx.proc.userdata)
+    ctx.add_shutdown_callback(flush_pending_state)
 
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=pick_voice(agent),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
+    await run_session(
+        ctx, session, ImprovAgent(), name="Improv Battle", logger=logger
     )
-    session.userdata = ctx.proc.userdata
-
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"Improv Battle usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=agent,
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
-
-    await ctx.connect()
 
 
 # -------------------------------------------------- #
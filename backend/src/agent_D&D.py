@@ -6,20 +6,17 @@ from typing import Optional
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
-    tokenize,
     function_tool,
     RunContext,
 )
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from sentence_chunking import ClauseTokenizer
 
 
 # -------------------------------------------------- #
@@ -45,6 +42,41 @@ async def restart_story(ctx: RunContext) -> str:
 # -------------------------------------------------- #
 #                  Game Master Agent                 #
 # -------------------------------------------------- #
+GAME_MASTER_INSTRUCTIONS = (
+    "You are a dramatic and immersive **Fantasy Game Master (GM)** "
+    "running a voice-based Dungeons & Dragons style adventure.\n\n"
+
+    "=== UNIVERSE ===\n"
+    "High-fantasy realm called Eldoria — dragons, ancient ruins, enchanted forests, "
+    "mystic artifacts, magical beasts, and lost kingdoms.\n\n"
+
+    "=== TONE ===\n"
+    "Epic, descriptive, adventurous, slightly mysterious.\n"
+    "Speak like a storyteller. Create wonder, danger, and excitement.\n\n"
+
+    "=== ROLE ===\n"
+    "- Narrate scenes vividly.\n"
+    "- Advance the story based on player decisions.\n"
+    "- ALWAYS end messages with a question: 'What do you do?'\n"
+    "- Maintain continuity using chat history.\n"
+    "- Remember characters, events, dangers, decisions.\n\n"
+
+    "=== RULES ===\n"
+    "- Start the adventure the moment the player speaks.\n"
+    "- Never break character.\n"
+    "- Avoid long paragraphs — keep responses 4–6 sentences.\n"
+    "- If user says things like 'restart story', call the tool restart_story().\n"
+    "- After tool returns 'story_restarted', begin a brand new adventure.\n\n"
+
+    "=== SESSION STRUCTURE ===\n"
+    "Your story should:\n"
+    "- Begin with a mysterious hook.\n"
+    "- Present choices, challenges, or characters.\n"
+    "- Build toward a small arc (e.g., discovering a relic, escaping danger).\n"
+    "- ALWAYS end with 'What do you do?'\n"
+)
+
+
 class GameMasterAgent(Agent):
     """
     Your Day 8 D&D-style fantasy adventure Game Master.
@@ -55,41 +87,7 @@ class GameMasterAgent(Agent):
         self.story_started = False
         self.player_name: Optional[str] = None
 
-        instructions = (
-            "You are a dramatic and immersive **Fantasy Game Master (GM)** "
-            "running a voice-based Dungeons & Dragons style adventure.\n\n"
-
-            "=== UNIVERSE ===\n"
-            "High-fantasy realm called Eldoria — dragons, ancient ruins, enchanted forests, "
-            "mystic artifacts, magical beasts, and lost kingdoms.\n\n"
-
-            "=== TONE ===\n"
-            "Epic, descriptive, adventurous, slightly mysterious.\n"
-            "Speak like a storyteller. Create wonder, danger, and excitement.\n\n"
-
-            "=== ROLE ===\n"
-            "- Narrate scenes vividly.\n"
-            "- Advance the story based on player decisions.\n"
-            "- ALWAYS end messages with a question: 'What do you do?'\n"
-            "- Maintain continuity using chat history.\n"
-            "- Remember characters, events, dangers, decisions.\n\n"
-
-            "=== RULES ===\n"
-            "- Start the adventure the moment the player speaks.\n"
-            "- Never break character.\n"
-            "- Avoid long paragraphs — keep responses 4–6 sentences.\n"
-            "- If user says things like 'restart story', call the tool restart_story().\n"
-            "- After tool returns 'story_restarted', begin a brand new adventure.\n\n"
-
-            "=== SESSION STRUCTURE ===\n"
-            "Your story should:\n"
-            "- Begin with a mysterious hook.\n"
-            "- Present choices, challenges, or characters.\n"
-            "- Build toward a small arc (e.g., discovering a relic, escaping danger).\n"
-            "- ALWAYS end with 'What do you do?'\n"
-        )
-
-        super().__init__(instructions=instructions, tools=[restart_story])
+        super().__init__(instructions=GAME_MASTER_INSTRUCTIONS, tools=[restart_story])
 
     # Reset state when restart_story() tool is called
     def reset_story_state(self):
@@ -100,20 +98,28 @@ class GameMasterAgent(Agent):
 # -------------------------------------------------- #
 #             Voice: Murf Falcon (India)             #
 # -------------------------------------------------- #
-def pick_voice(agent: GameMasterAgent):
+def pick_voice():
     return murf.TTS(
         voice="en-IN-Anisha",
         style="Conversational",
-        tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+        tokenizer=ClauseTokenizer(),
         text_pacing=True,
     )
 
 
 # -------------------------------------------------- #
-#                Prewarm VAD Model                   #
+#              Prewarm VAD + TTS Voice               #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    prewarm_plugins(
+        proc,
+        pick_voice(),
+        stt_kwargs={
+            "language": "en",
+            # players narrate long actions; merge pauses into fewer finals
+            "endpointing_ms": 400,
+        },
+    )
 
 
 # -------------------------------------------------- #
@@ -122,39 +128,14 @@ def prewarm(proc: JobProcess):
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {"room": ctx.room.name}
 
-    agent = GameMasterAgent()
-
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=pick_voice(agent),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
+    await run_session(
+        ctx,
+        make_session(ctx.proc),
+        GameMasterAgent(),
+        name="Game Master Agent",
+        logger=logger,
     )
 
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"Game Master Agent usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=agent,
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
-
-    await ctx.connect()
-
 
 # -------------------------------------------------- #
 #                      Runner                        #
@@ -1,27 +1,28 @@
+import asyncio
+import bisect
+import contextlib
 import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
-import json
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
     tokenize,
     function_tool,
     RunContext,
 )
 
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from json_io import CoalescingFlusher, write_json_atomic
 
 # -------------------------------------------------- #
 #                    Setup                           #
@@ -29,7 +30,17 @@ from livekit.plugins.turn_detector.multilingual import MultilingualModel
 logger = logging.getLogger("ecommerce_agent")
 load_dotenv(".env.local")
 
-ORDERS_FILE = "orders.json"
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ORDERS_FILE = os.path.join(BASE_DIR, "orders.json")
+# each room runs in its own job process; these sidecars let them share
+# orders.json without handing out the same id or dropping each other's orders
+ORDERS_LOCK_FILE = ORDERS_FILE + ".lock"
+ORDERS_SEQ_FILE = ORDERS_FILE + ".seq"
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so keep to one worker process
+    fcntl = None
 
 # -------------------------------------------------- #
 #          Load & Save Orders Persistently           #
@@ -38,18 +49,95 @@ def load_orders() -> List[Dict[str, Any]]:
     if not os.path.exists(ORDERS_FILE):
         return []
     try:
-        with open(ORDERS_FILE, "r") as f:
-            return json.load(f)
+        with open(ORDERS_FILE, "rb") as f:
+            return orjson.loads(f.read())
     except Exception:
         return []
 
+
 def save_orders(orders: List[Dict[str, Any]]):
-    with open(ORDERS_FILE, "w") as f:
-        json.dump(orders, f, indent=2)
+    write_json_atomic(ORDERS_FILE, orjson.dumps(orders, option=orjson.OPT_INDENT_2))
 
 
 ORDERS = load_orders()
 
+
+def _next_order_number(orders: List[Dict[str, Any]]) -> int:
+    # seeds the id counter from the highest saved id rather than len(orders),
+    # so a hand-edited or trimmed orders.json never hands out an existing id
+    highest = 0
+    for order in orders:
+        _, _, num = str(order.get("id", "")).rpartition("-")
+        if num.isdigit():
+            highest = max(highest, int(num))
+    return highest + 1
+
+
+@contextlib.contextmanager
+def _orders_lock():
+    with open(ORDERS_LOCK_FILE, "a") as f:
+        if fcntl is not None:
+            # released when the file is closed
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _reserve_order_number() -> int:
+    # the last handed-out number lives in a sidecar so reserving one is O(1)
+    # and orders still waiting on a flush in another process are counted.
+    # A plain write is enough under the lock: no fsync on the tool-call path,
+    # and a sidecar lost in a crash is reseeded from orders.json.
+    with _orders_lock():
+        try:
+            with open(ORDERS_SEQ_FILE, "rb") as f:
+                number = int(f.read()) + 1
+        except (FileNotFoundError, ValueError):
+            number = _next_order_number(load_orders())
+        with open(ORDERS_SEQ_FILE, "wb") as f:
+            f.write(str(number).encode())
+    return number
+
+
+def _append_orders_sync(new_orders: List[Dict[str, Any]]):
+    # re-read under the lock so orders saved by other rooms are kept
+    with _orders_lock():
+        orders = load_orders()
+        orders.extend(new_orders)
+        save_orders(orders)
+
+
+# create_order marks the orders dirty and they are appended to orders.json
+# once a burst of orders has settled.
+ORDERS_FLUSH_DELAY = 0.2
+_unsaved_orders: List[Dict[str, Any]] = []
+
+
+async def _write_orders():
+    # snapshot on the loop so create_order can keep appending meanwhile
+    batch = list(_unsaved_orders)
+    try:
+        await asyncio.to_thread(_append_orders_sync, batch)
+    except Exception:
+        logger.exception("Failed to save orders")
+        return
+    # failed batches stay queued for the next flush
+    del _unsaved_orders[: len(batch)]
+
+
+_orders_flusher = CoalescingFlusher(_write_orders, ORDERS_FLUSH_DELAY)
+
+
+def mark_orders_dirty():
+    _orders_flusher.mark_dirty()
+
+
+async def flush_pending_orders():
+    """Write out any orders still waiting on the flush delay."""
+    await _orders_flusher.flush_now()
+    # give a batch that failed earlier one last try
+    if _unsaved_orders:
+        await _write_orders()
+
 # -------------------------------------------------- #
 #                   Catalog                          #
 # -------------------------------------------------- #
@@ -91,23 +179,64 @@ PRODUCTS = [
     }
 ]
 
+_PRODUCTS_BY_ID = {p["id"]: p for p in PRODUCTS}
+
+
+def _index_by(key: str) -> Dict[Any, List[Dict[str, Any]]]:
+    index: Dict[Any, List[Dict[str, Any]]] = {}
+    for p in PRODUCTS:
+        index.setdefault(p.get(key), []).append(p)
+    return index
+
+
+# filter indexes; every bucket keeps catalog order
+_BY_CATEGORY = _index_by("category")
+_BY_COLOR = _index_by("color")
+_SORTED_BY_PRICE = sorted(PRODUCTS, key=lambda p: p["price"])
+_SORTED_PRICES = [p["price"] for p in _SORTED_BY_PRICE]
+_CATALOG_POSITION = {id(p): i for i, p in enumerate(PRODUCTS)}
+
 # -------------------------------------------------- #
 #               Merchant Layer Tools                 #
 # -------------------------------------------------- #
 
-def apply_filters(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-    result = PRODUCTS
-
-    if "category" in filters:
-        result = [p for p in result if p["category"] == filters["category"]]
-
-    if "color" in filters:
-        result = [p for p in result if p.get("color") == filters["color"]]
+def _index_hits(index: Dict[Any, List[Dict[str, Any]]], value: Any) -> List[Dict[str, Any]]:
+    # filter values come straight from the LLM; anything but a string (e.g. a
+    # list of colors) is unhashable or never equals a catalog value
+    if not isinstance(value, str):
+        return []
+    return index.get(value, [])
 
-    if "max_price" in filters:
-        result = [p for p in result if p["price"] <= filters["max_price"]]
 
-    return result
+def apply_filters(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # a missing (or null) filter matches everything; results are in catalog order
+    category = filters.get("category")
+    color = filters.get("color")
+    max_price = filters.get("max_price")
+
+    candidates = []
+    if category is not None:
+        candidates.append(_index_hits(_BY_CATEGORY, category))
+    if color is not None:
+        candidates.append(_index_hits(_BY_COLOR, color))
+    if max_price is not None:
+        cut = bisect.bisect_right(_SORTED_PRICES, max_price)
+        candidates.append(_SORTED_BY_PRICE[:cut])
+    if not candidates:
+        return list(PRODUCTS)
+
+    # walk the smallest index hit and check the other filters on it
+    smallest = min(candidates, key=len)
+    matches = [
+        p
+        for p in smallest
+        if (category is None or p["category"] == category)
+        and (color is None or p.get("color") == color)
+        and (max_price is None or p["price"] <= max_price)
+    ]
+    if max_price is not None and smallest is candidates[-1]:
+        matches.sort(key=lambda p: _CATALOG_POSITION[id(p)])
+    return matches
 
 
 @function_tool
@@ -133,7 +262,8 @@ async def create_order(ctx: RunContext, items: List[Dict[str, Any]]) -> Dict[str
         pid = line["product_id"]
         qty = line.get("quantity", 1)
 
-        prod = next((p for p in PRODUCTS if p["id"] == pid), None)
+        # ids come from tool arguments; an unhashable one simply doesn't match
+        prod = _PRODUCTS_BY_ID.get(pid) if isinstance(pid, str) else None
         if not prod:
             continue
 
@@ -148,16 +278,18 @@ async def create_order(ctx: RunContext, items: List[Dict[str, Any]]) -> Dict[str
             "subtotal": price,
         })
 
+    number = await asyncio.to_thread(_reserve_order_number)
     order = {
-        "id": f"order-{len(ORDERS)+1:03}",
+        "id": f"order-{number:03}",
         "items": order_items,
         "total": total,
         "currency": "INR",
-        "created_at": datetime.utcnow().isoformat(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
     }
 
     ORDERS.append(order)
-    save_orders(ORDERS)
+    _unsaved_orders.append(order)
+    mark_orders_dirty()
 
     return order
 
@@ -171,40 +303,40 @@ async def get_last_order(ctx: RunContext) -> Dict[str, Any] | None:
 # -------------------------------------------------- #
 #                    E-Commerce Agent                #
 # -------------------------------------------------- #
+ECOMMERCE_INSTRUCTIONS = (
+    "You are a friendly **E-commerce Shopping Assistant**.\n\n"
+
+    "You help users browse products and place orders.\n\n"
+
+    "=== BEHAVIOR RULES ===\n"
+    "- When user asks about items, call list_products(filters).\n"
+    "- When user tries to buy something, call create_order(items).\n"
+    "- When user asks what they purchased, call get_last_order().\n"
+    "- Always respond briefly, 2–4 sentences.\n"
+    "- Keep a conversational, helpful tone.\n"
+    "- Do not invent products that do not exist in the catalog.\n"
+    "- Extract attributes like category, color, size, price filters.\n"
+    "- Ensure all the attributes are filled before placing the order. \n"
+    "- If user asks for a product that is not available, suggest alternatives.\n"
+    "- After calling tools, summarize results clearly.\n"
+)
+
+ECOMMERCE_TOOLS = [list_products, create_order, get_last_order]
+
+
 class EcommerceAgent(Agent):
     """
     Voice-based e-commerce assistant following ACP-inspired flow.
     """
 
     def __init__(self):
-        instructions = (
-            "You are a friendly **E-commerce Shopping Assistant**.\n\n"
-
-            "You help users browse products and place orders.\n\n"
-
-            "=== BEHAVIOR RULES ===\n"
-            "- When user asks about items, call list_products(filters).\n"
-            "- When user tries to buy something, call create_order(items).\n"
-            "- When user asks what they purchased, call get_last_order().\n"
-            "- Always respond briefly, 2–4 sentences.\n"
-            "- Keep a conversational, helpful tone.\n"
-            "- Do not invent products that do not exist in the catalog.\n"
-            "- Extract attributes like category, color, size, price filters.\n"
-            "- Ensure all the attributes are filled before placing the order. \n"
-            "- If user asks for a product that is not available, suggest alternatives.\n"
-            "- After calling tools, summarize results clearly.\n"
-        )
-
-        super().__init__(
-            instructions=instructions,
-            tools=[list_products, create_order, get_last_order],
-        )
+        super().__init__(instructions=ECOMMERCE_INSTRUCTIONS, tools=ECOMMERCE_TOOLS)
 
 
 # -------------------------------------------------- #
 #             Voice: Murf Falcon (India)             #
 # -------------------------------------------------- #
-def pick_voice(agent: EcommerceAgent):
+def pick_voice():
     return murf.TTS(
         voice="en-IN-Anisha",
         style="Conversational",
@@ -214,10 +346,10 @@ def pick_voice(agent: EcommerceAgent):
 
 
 # -------------------------------------------------- #
-#                Prewarm VAD Model                   #
+#              Prewarm VAD + Plugins                 #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    prewarm_plugins(proc, pick_voice())
 
 
 # -------------------------------------------------- #
@@ -226,39 +358,16 @@ def prewarm(proc: JobProcess):
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {"room": ctx.room.name}
 
-    agent = EcommerceAgent()
+    ctx.add_shutdown_callback(flush_pending_orders)
 
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=pick_voice(agent),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
+    await run_session(
+        ctx,
+        make_session(ctx.proc),
+        EcommerceAgent(),
+        name="E-commerce Agent",
+        logger=logger,
     )
 
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"E-commerce Agent usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=agent,
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
-
-    await ctx.connect()
-
 
 # -------------------------------------------------- #
 #                      Runner                        #
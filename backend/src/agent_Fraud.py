@@ -1,27 +1,26 @@
+import asyncio
 import logging
 import os
-import json
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
     tokenize,
     function_tool,
     RunContext,
 )
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from json_io import write_json_atomic
 
 # -------------------------------------------------- #
 #                        Setup                        #
@@ -38,6 +37,28 @@ FRAUD_DB_PATH = os.path.join(DATA_DIR, "fraud_cases.json")
 # -------------------------------------------------- #
 #               Username extraction helper           #
 # -------------------------------------------------- #
+# compiled once at import; extract_username matches them against text that
+# is already lowercased, so no IGNORECASE is needed.
+# Tried in order, first match wins: an earlier pattern beats a later one
+# even if the later one matches further left, which is why they are not
+# merged into one alternation.
+_USERNAME_PATTERNS = [
+    re.compile(r"username\s*(?:is|:|\-|=)\s*([a-z0-9._-]+)"),  # username is sam / username: sam
+    re.compile(r"my username is\s*([a-z0-9._-]+)"),
+    re.compile(r"it's username\s*([a-z0-9._-]+)"),
+    re.compile(r"username\s+([a-z0-9._-]+)"),  # username sam
+    re.compile(r"i am\s+([a-z0-9._-]+)"),  # i am sam
+    re.compile(r"i'm\s+([a-z0-9._-]+)"),
+    re.compile(r"it is\s+([a-z0-9._-]+)"),
+]
+_USERNAME_TOKEN_RE = re.compile(r"^[a-z0-9._-]+$")
+_USERNAME_TOKEN_MIN2_RE = re.compile(r"^[a-z0-9._-]{2,}$")
+# a bare spoken username like "sam" needs none of the patterns above
+_BARE_USERNAME_RE = re.compile(r"^[a-z0-9._-]{2,32}$")
+# punctuation speech-to-text leaves around a spoken username
+_USERNAME_TRIM_CHARS = ".,;!?'\""
+
+
 def extract_username(raw: str) -> str:
     """
     Extract a likely username token from a free-form transcription.
@@ -46,49 +67,38 @@ def extract_username(raw: str) -> str:
       - "username: neha.r"    -> "neha.r"
       - "It is Megha.S."      -> "megha.s"
       - "sam"                 -> "sam"
+    The result is already lowercased and trimmed.
     Returns empty string if nothing plausible found.
     """
     if not raw:
         return ""
 
-    text = raw.strip()
-
-    # try some regex patterns (case-insensitive)
-    patterns = [
-        r"username\s*(?:is|:|\-|=)\s*([A-Za-z0-9._-]+)",   # username is sam / username: sam
-        r"my username is\s*([A-Za-z0-9._-]+)",
-        r"it's username\s*([A-Za-z0-9._-]+)",
-        r"username\s+([A-Za-z0-9._-]+)",                  # username sam
-        r"i am\s+([A-Za-z0-9._-]+)",                      # i am sam
-        r"i'm\s+([A-Za-z0-9._-]+)",
-        r"it is\s+([A-Za-z0-9._-]+)",
-    ]
+    lowered = raw.strip().lower()
+    # fast path: the input is already just the username
+    if _BARE_USERNAME_RE.match(lowered) and "username" not in lowered:
+        return lowered.strip(_USERNAME_TRIM_CHARS)
 
-    lowered = text.lower()
-    for pat in patterns:
-        m = re.search(pat, lowered, flags=re.IGNORECASE)
+    # try some regex patterns (on the lowercased text)
+    for pat in _USERNAME_PATTERNS:
+        m = pat.search(lowered)
         if m:
-            candidate = m.group(1)
-            candidate = candidate.strip().strip(".,;!?'\"")
-            return candidate.lower()
+            # the capture is already lowercase with no whitespace
+            return m.group(1).strip(_USERNAME_TRIM_CHARS)
 
-    # fallback: take last token (common in speech)
-    tokens = re.split(r"\s+", text)
-    if not tokens:
-        return ""
+    # fallback: take last token (common in speech); rsplit only cuts once
+    parts = lowered.rsplit(None, 1)
 
-    last = tokens[-1].strip()
     # remove trailing punctuation
-    last = last.strip(".,;!?'\"").lower()
+    last = parts[-1].strip(_USERNAME_TRIM_CHARS) if parts else ""
 
     # if last contains only letters/digits and punctuation used in usernames, accept
-    if re.match(r"^[a-z0-9._-]+$", last, flags=re.IGNORECASE):
-        return last.lower()
+    if _USERNAME_TOKEN_RE.match(last):
+        return last
 
     # otherwise try to find first token that looks like username
-    for t in tokens:
-        t2 = t.strip(".,;!?'\"").lower()
-        if re.match(r"^[a-z0-9._-]{2,}$", t2):
+    for t in lowered.split():
+        t2 = t.strip(_USERNAME_TRIM_CHARS)
+        if _USERNAME_TOKEN_MIN2_RE.match(t2):
             return t2
 
     return ""
@@ -99,15 +109,13 @@ def extract_username(raw: str) -> str:
 # -------------------------------------------------- #
 def ensure_sample_db():
     """If the fraud_cases.json file doesn't exist, create it with sample entries."""
-    if os.path.exists(FRAUD_DB_PATH):
-        try:
-            # ensure it's valid JSON
-            with open(FRAUD_DB_PATH, "r", encoding="utf-8") as f:
-                json.load(f)
-            return
-        except Exception:
-            logger.warning("Existing fraud DB is invalid — will overwrite with sample data.")
+    # an existing file is not parsed here; the first lookup parses it and
+    # falls back to the sample data if it is not valid JSON
+    if not os.path.exists(FRAUD_DB_PATH):
+        write_sample_db()
+
 
+def write_sample_db():
     sample_cases = [
         {
             "case_id": "CASE-1001",
@@ -141,39 +149,101 @@ def ensure_sample_db():
     ]
 
     try:
-        with open(FRAUD_DB_PATH, "w", encoding="utf-8") as f:
-            json.dump(sample_cases, f, indent=2, ensure_ascii=False)
-        logger.info(f"Created sample fraud DB at {FRAUD_DB_PATH}")
+        write_json_atomic(
+            FRAUD_DB_PATH, orjson.dumps(sample_cases, option=orjson.OPT_INDENT_2)
+        )
+        logger.info("Created sample fraud DB at %s", FRAUD_DB_PATH)
     except Exception:
         logger.exception("Failed to write sample fraud DB")
 
 
-# Ensure DB exists at import time
-ensure_sample_db()
-
-
 # -------------------------------------------------- #
 #                DB read / write helpers              #
 # -------------------------------------------------- #
+# parsed fraud DB and the file mtime it was parsed at; re-read only when the
+# file changes on disk, and kept in step with our own writes
+_FRAUD_CACHE: Dict[str, Any] = {
+    "mtime": None, "cases": [], "by_username": {}, "validated": False
+}
+
+
+def _index_by_username(cases: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    index: Dict[str, Dict[str, Any]] = {}
+    if not isinstance(cases, list):
+        return index
+    for case in cases:
+        # malformed entries are left out of the index rather than raising
+        if not isinstance(case, dict):
+            continue
+        username = case.get("username")
+        if isinstance(username, str):
+            # first matching case wins, as with the old linear scan
+            index.setdefault(username.strip().lower(), case)
+    return index
+
+
+def _cache_cases(mtime: Optional[int], cases: List[Dict[str, Any]]) -> None:
+    _FRAUD_CACHE.update(
+        mtime=mtime, cases=cases, by_username=_index_by_username(cases)
+    )
+
+
+def _refresh_fraud_cache() -> None:
+    mtime = os.stat(FRAUD_DB_PATH).st_mtime_ns
+    if _FRAUD_CACHE["mtime"] != mtime:
+        with open(FRAUD_DB_PATH, "rb") as f:
+            cases = orjson.loads(f.read())
+        _cache_cases(mtime, cases)
+
+
+def _load_fraud_cache() -> None:
+    # the DB is parsed lazily; the first load also replaces an invalid file
+    # with the sample data, as the import-time check used to
+    try:
+        _refresh_fraud_cache()
+    except orjson.JSONDecodeError:
+        if _FRAUD_CACHE["validated"]:
+            raise
+        logger.warning("Existing fraud DB is invalid — will overwrite with sample data.")
+        write_sample_db()
+        _refresh_fraud_cache()
+    finally:
+        _FRAUD_CACHE["validated"] = True
+
+
 def read_fraud_db() -> List[Dict[str, Any]]:
     try:
-        with open(FRAUD_DB_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
+        _load_fraud_cache()
+        return _FRAUD_CACHE["cases"]
+    except Exception:
+        _cache_cases(None, [])
         logger.exception("Failed to read fraud DB")
         return []
 
 
+def find_case_by_username(username: str) -> Optional[Dict[str, Any]]:
+    read_fraud_db()  # refreshes the cache and its index if the file changed
+    return _FRAUD_CACHE["by_username"].get(username)
+
+
 def write_fraud_db(cases: List[Dict[str, Any]]) -> bool:
     try:
-        with open(FRAUD_DB_PATH, "w", encoding="utf-8") as f:
-            json.dump(cases, f, indent=2, ensure_ascii=False)
+        write_json_atomic(
+            FRAUD_DB_PATH, orjson.dumps(cases, option=orjson.OPT_INDENT_2)
+        )
+        _cache_cases(os.stat(FRAUD_DB_PATH).st_mtime_ns, cases)
         return True
     except Exception:
+        # callers may have changed the cached cases in place; drop them
+        _FRAUD_CACHE["mtime"] = None
         logger.exception("Failed to write fraud DB")
         return False
 
 
+# Ensure DB exists at import time; it is parsed on the first lookup
+ensure_sample_db()
+
+
 # -------------------------------------------------- #
 #                    Tool: Get case                   #
 # -------------------------------------------------- #
@@ -184,17 +254,15 @@ async def get_fraud_case_by_username(ctx: RunContext, username: str) -> str:
     or the string "not_found".
     This now extracts a cleaned username token from free-form input before lookup.
     """
-    # Extract and normalize
-    username_clean = extract_username(username)
-    username_norm = (username_clean or "").strip().lower()
+    # Extract a normalized username token
+    username_norm = extract_username(username)
     if not username_norm:
         return "not_found"
 
-    cases = read_fraud_db()
-    for case in cases:
-        if case.get("username", "").strip().lower() == username_norm:
-            return json.dumps(case)
-    return "not_found"
+    case = await asyncio.to_thread(find_case_by_username, username_norm)
+    if case is None:
+        return "not_found"
+    return orjson.dumps(case).decode()
 
 
 # -------------------------------------------------- #
@@ -205,18 +273,18 @@ async def update_fraud_case(ctx: RunContext, case_id: str, new_status: str, outc
     """
     Update the case with given case_id. Returns 'saved:<path>' or 'not_found' or 'error'.
     """
-    cases = read_fraud_db()
+    cases = await asyncio.to_thread(read_fraud_db)
     found = False
     for c in cases:
         if c.get("case_id") == case_id:
             c["status"] = new_status
             c["outcome_note"] = outcome_note
-            c["last_updated"] = datetime.utcnow().isoformat(timespec="seconds")
+            c["last_updated"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
             found = True
             break
     if not found:
         return "not_found"
-    ok = write_fraud_db(cases)
+    ok = await asyncio.to_thread(write_fraud_db, cases)
     if not ok:
         return "error"
     return f"saved:{FRAUD_DB_PATH}"
@@ -225,6 +293,41 @@ async def update_fraud_case(ctx: RunContext, case_id: str, new_status: str, outc
 # -------------------------------------------------- #
 #                    Fraud Agent Persona              #
 # -------------------------------------------------- #
+FRAUD_INSTRUCTIONS = (
+    "You are a calm, professional fraud representative for 'Summit Bank' Fraud Response Team.\n\n"
+    "The username for this session is ALWAYS 'sam'"
+    "=== CALL FLOW ===\n"
+    "1. Greet caller and explain this is about a suspicious transaction.\n"
+    "2. Ask the caller for their **username**.\n"
+    "3. When user gives username, ALWAYS call the tool:\n"
+    "      get_fraud_case_by_username(username)\n\n"
+
+    "4. When tool returns a JSON case:\n"
+    "      - Parse it.\n"
+    "      - Store it internally as: active_case\n"
+    "        (Meaning the agent must remember it for the rest of the call.)\n\n"
+
+    "5. Ask the security question stored in active_case.security_question.\n"
+    "   Compare user’s spoken answer (lowercase) to active_case.security_answer.\n"
+    "   • If mismatch → verification_failed → call update_fraud_case() and end call.\n\n"
+
+    "6. If verification succeeds:\n"
+    "   • Read suspicious transaction details from active_case\n"
+    "   • Ask: 'Did you make this transaction? Yes/No?'\n"
+    "   • If YES → confirmed_safe → call update_fraud_case()\n"
+    "   • If NO → confirmed_fraud → call update_fraud_case()\n\n"
+
+    "7. End the call with reassurance and final status.\n\n"
+
+    "RULES:\n"
+    "- NEVER ask for full card number, password, PIN, CVV.\n"
+    "- Only use the fields inside the loaded case.\n"
+    "- ALWAYS store the loaded case into active_case before continuing.\n"
+)
+
+FRAUD_TOOLS = [get_fraud_case_by_username, update_fraud_case]
+
+
 class FraudAgent(Agent):
     def __init__(self) -> None:
         self.active_case = None
@@ -236,45 +339,14 @@ class FraudAgent(Agent):
 
         On conclusion it must call update_fraud_case(case_id, new_status, outcome_note).
         """
-        instructions = (
-            "You are a calm, professional fraud representative for 'Summit Bank' Fraud Response Team.\n\n"
-            "The username for this session is ALWAYS 'sam'"
-            "=== CALL FLOW ===\n"
-            "1. Greet caller and explain this is about a suspicious transaction.\n"
-            "2. Ask the caller for their **username**.\n"
-            "3. When user gives username, ALWAYS call the tool:\n"
-            "      get_fraud_case_by_username(username)\n\n"
-
-            "4. When tool returns a JSON case:\n"
-            "      - Parse it.\n"
-            "      - Store it internally as: active_case\n"
-            "        (Meaning the agent must remember it for the rest of the call.)\n\n"
-
-            "5. Ask the security question stored in active_case.security_question.\n"
-            "   Compare user’s spoken answer (lowercase) to active_case.security_answer.\n"
-            "   • If mismatch → verification_failed → call update_fraud_case() and end call.\n\n"
-
-            "6. If verification succeeds:\n"
-            "   • Read suspicious transaction details from active_case\n"
-            "   • Ask: 'Did you make this transaction? Yes/No?'\n"
-            "   • If YES → confirmed_safe → call update_fraud_case()\n"
-            "   • If NO → confirmed_fraud → call update_fraud_case()\n\n"
-
-            "7. End the call with reassurance and final status.\n\n"
-
-            "RULES:\n"
-            "- NEVER ask for full card number, password, PIN, CVV.\n"
-            "- Only use the fields inside the loaded case.\n"
-            "- ALWAYS store the loaded case into active_case before continuing.\n"
-        )
 
-        super().__init__(instructions=instructions, tools=[get_fraud_case_by_username, update_fraud_case])
+        super().__init__(instructions=FRAUD_INSTRUCTIONS, tools=FRAUD_TOOLS)
 
 
 # -------------------------------------------------- #
 #                Single Voice (No Switching)         #
 # -------------------------------------------------- #
-def pick_voice(agent: FraudAgent):
+def pick_voice():
     # Using Murf Falcon Indian English voice (Anisha) per your request
     return murf.TTS(
         voice="en-IN-Anisha",
@@ -285,10 +357,10 @@ def pick_voice(agent: FraudAgent):
 
 
 # -------------------------------------------------- #
-#                     Prewarm VAD                    #
+#              Prewarm VAD + Plugins                 #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    prewarm_plugins(proc, pick_voice())
 
 
 # -------------------------------------------------- #
@@ -298,39 +370,14 @@ async def entrypoint(ctx: JobContext):
 
     ctx.log_context_fields = {"room": ctx.room.name}
 
-    agent = FraudAgent()
-
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=pick_voice(agent),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
-    )
-
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"Fraud Agent usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=agent,
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC()
-        ),
+    await run_session(
+        ctx,
+        make_session(ctx.proc),
+        FraudAgent(),
+        name="Fraud Agent",
+        logger=logger,
     )
 
-    await ctx.connect()
-
 
 # -------------------------------------------------- #
 #                     Main Runner                    #
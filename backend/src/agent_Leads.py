@@ -1,26 +1,28 @@
+import asyncio
 import logging
 import os
-import json
-from datetime import datetime
+import re
+import string
+from collections import Counter
+from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
-    tokenize,
     function_tool,
     RunContext,
 )
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from json_io import write_json_atomic
+from sentence_chunking import ClauseTokenizer
 
 # -------------------------------------------------- #
 #                        Setup                        #
@@ -29,12 +31,11 @@ from livekit.plugins.turn_detector.multilingual import MultilingualModel
 logger = logging.getLogger("sdr_agent")
 load_dotenv(".env.local")
 
-COMPANY_CONTENT_PATH = os.path.join(
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..")),
-    "shared-data/company_profile.json"
-)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+COMPANY_CONTENT_PATH = os.path.join(BASE_DIR, "shared-data/company_profile.json")
 
-LEADS_DIR = os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")), "leads")
+LEADS_DIR = os.path.join(BASE_DIR, "leads")
 os.makedirs(LEADS_DIR, exist_ok=True)
 
 
@@ -43,12 +44,17 @@ os.makedirs(LEADS_DIR, exist_ok=True)
 # -------------------------------------------------- #
 def load_company_content() -> Dict[str, Any]:
     if not os.path.exists(COMPANY_CONTENT_PATH):
-        logger.warning(f"Company content file not found: {COMPANY_CONTENT_PATH}")
+        logger.warning("Company content file not found: %s", COMPANY_CONTENT_PATH)
         return {}
     try:
-        with open(COMPANY_CONTENT_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
+        with open(COMPANY_CONTENT_PATH, "rb") as f:
+            content = orjson.loads(f.read())
+        # shortest entries first, so score ties resolve to the most concise answer
+        faq = content.get("faq")
+        if isinstance(faq, list):
+            faq.sort(key=lambda e: len(e.get("q", "")) + len(e.get("a", "")))
+        return content
+    except Exception:
         logger.exception("Failed to load company content")
         return {}
 
@@ -67,8 +73,9 @@ async def save_lead(
     team_size: Optional[str],
     timeline: Optional[str],
 ) -> str:
+    now = datetime.now(timezone.utc)
     lead = {
-        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "timestamp": now.isoformat(timespec="seconds"),
         "name": name or "",
         "company": company or "",
         "email": email or "",
@@ -78,12 +85,12 @@ async def save_lead(
         "timeline": timeline or "",
     }
 
-    ts = datetime.utcnow().isoformat(timespec="seconds").replace(":", "-")
-    filename = f"lead_{ts}.json"
+    filename = f"lead_{now:%Y-%m-%dT%H-%M-%S}.json"
     path = os.path.join(LEADS_DIR, filename)
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(lead, f, indent=2, ensure_ascii=False)
+        await asyncio.to_thread(
+            write_json_atomic, path, orjson.dumps(lead, option=orjson.OPT_INDENT_2)
+        )
     except Exception:
         logger.exception("Failed to save lead to disk")
         return "error"
@@ -93,26 +100,73 @@ async def save_lead(
 # -------------------------------------------------- #
 #                    Helper functions                 #
 # -------------------------------------------------- #
-def find_faq(query: str, faq_list: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+_FAQ_TOKEN_RE = re.compile(r"\w{3,}")
+
+
+def build_faq_index(faq_list: List[Dict[str, str]]) -> Dict[str, List[int]]:
+    """Map each casefolded word token to the indices of the FAQ entries containing it."""
+    index: Dict[str, List[int]] = {}
+    for i, entry in enumerate(faq_list):
+        text = f"{entry.get('q','')} {entry.get('a','')}".casefold()
+        for token in set(_FAQ_TOKEN_RE.findall(text)):
+            index.setdefault(token, []).append(i)
+    return index
+
+
+def find_faq(
+    query: str,
+    faq_list: List[Dict[str, str]],
+    faq_index: Optional[Dict[str, List[int]]] = None,
+) -> Optional[Dict[str, str]]:
     if not faq_list:
         return None
-    q = query.lower()
-    # simplified token matching
-    tokens = [t for t in q.split() if len(t) > 2]
-    for entry in faq_list:
-        text = f"{entry.get('q','')} {entry.get('a','')}".lower()
-        for t in tokens:
-            if t in text:
-                return entry
-    return None
+    tokens = set(_FAQ_TOKEN_RE.findall(query.casefold()))
+    if not tokens:
+        return None
+    if faq_index is None:
+        faq_index = build_faq_index(faq_list)
+
+    # score entries by how many query tokens they contain
+    scores: Counter = Counter()
+    for token in tokens:
+        scores.update(faq_index.get(token, ()))
+    if not scores:
+        return None
+    # highest score wins, earlier entries break ties
+    best = min(scores, key=lambda i: (-scores[i], i))
+    return faq_list[best]
 
 
 # -------------------------------------------------- #
 #                    SDR Agent Persona                #
 # -------------------------------------------------- #
+SDR_INSTRUCTIONS_TEMPLATE = string.Template(
+    "You are LearnMate SDR, the Sales Development Representative for ${company_name}.\n\n"
+    "Company brief: ${company_one_liner}\n\n"
+    "SDR behavior rules:\n"
+    "1. Greet visitors warmly and introduce yourself and the company.\n"
+    "2. Ask what brought them here and what they're working on.\n"
+    "3. Keep the conversation focused on understanding the user's needs.\n"
+    "4. Use the provided company content (FAQ/pricing) to answer product/pricing questions. "
+    "If the content does not contain the answer, say you don't have that information and offer to take contact details.\n"
+    "5. Collect lead fields naturally during the conversation: name, company, email, role, use_case, team_size, timeline.\n"
+    "6. When the user indicates they are done (e.g., 'that's all', 'thanks', 'goodbye'), provide a short verbal lead summary and call save_lead(...) to persist the collected data.\n"
+    "7. Keep language concise, polite, and professional.\n"
+)
+
+
 class SDRAgent(Agent):
-    def __init__(self):
-        self.company_content = load_company_content()
+    def __init__(
+        self,
+        company_content: Optional[Dict[str, Any]] = None,
+        faq_index: Optional[Dict[str, List[int]]] = None,
+    ):
+        if company_content is None:
+            company_content = load_company_content()
+        self.company_content = company_content
+        if faq_index is None:
+            faq_index = build_faq_index(self.get_faq())
+        self.faq_index = faq_index
         self.mode = "sdr"
         self.lead_state: Dict[str, Optional[str]] = {
             "name": None,
@@ -128,18 +182,9 @@ class SDRAgent(Agent):
         company_name = comp.get("name", "Shreyas Media")
         company_one_liner = comp.get("one_liner", comp.get("overview", ""))
 
-        instructions = (
-            f"You are LearnMate SDR, the Sales Development Representative for {company_name}.\n\n"
-            f"Company brief: {company_one_liner}\n\n"
-            "SDR behavior rules:\n"
-            "1. Greet visitors warmly and introduce yourself and the company.\n"
-            "2. Ask what brought them here and what they're working on.\n"
-            "3. Keep the conversation focused on understanding the user's needs.\n"
-            "4. Use the provided company content (FAQ/pricing) to answer product/pricing questions. "
-            "If the content does not contain the answer, say you don't have that information and offer to take contact details.\n"
-            "5. Collect lead fields naturally during the conversation: name, company, email, role, use_case, team_size, timeline.\n"
-            "6. When the user indicates they are done (e.g., 'that's all', 'thanks', 'goodbye'), provide a short verbal lead summary and call save_lead(...) to persist the collected data.\n"
-            "7. Keep language concise, polite, and professional.\n"
+        instructions = SDR_INSTRUCTIONS_TEMPLATE.substitute(
+            company_name=company_name,
+            company_one_liner=company_one_liner,
         )
 
         super().__init__(instructions=instructions, tools=[save_lead])
@@ -147,6 +192,9 @@ class SDRAgent(Agent):
     def get_faq(self) -> List[Dict[str, str]]:
         return self.company_content.get("faq", [])
 
+    def find_faq(self, query: str) -> Optional[Dict[str, str]]:
+        return find_faq(query, self.get_faq(), self.faq_index)
+
     def company_brief(self) -> str:
         comp = self.company_content.get("company", {})
         name = comp.get("name", "Shreyas Media")
@@ -157,20 +205,23 @@ class SDRAgent(Agent):
 # -------------------------------------------------- #
 #                Single Voice (No Switching)         #
 # -------------------------------------------------- #
-def pick_voice(agent: SDRAgent):
+def pick_voice():
     return murf.TTS(
         voice="en-US-matthew",
         style="Conversation",
-        tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+        tokenizer=ClauseTokenizer(),
         text_pacing=True,
     )
 
 
 # -------------------------------------------------- #
-#                     Prewarm VAD                    #
+#     Prewarm VAD, Company Content + Plugins         #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    company_content = load_company_content()
+    proc.userdata["company_content"] = company_content
+    proc.userdata["faq_index"] = build_faq_index(company_content.get("faq", []))
+    prewarm_plugins(proc, pick_voice())
 
 
 # -------------------------------------------------- #
@@ -180,39 +231,15 @@ async def entrypoint(ctx: JobContext):
 
     ctx.log_context_fields = {"room": ctx.room.name}
 
-    sdr = SDRAgent()
-
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=pick_voice(sdr),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
+    sdr = SDRAgent(
+        company_content=ctx.proc.userdata["company_content"],
+        faq_index=ctx.proc.userdata["faq_index"],
     )
 
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"LearnMate SDR usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=sdr,
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC()
-        ),
+    await run_session(
+        ctx, make_session(ctx.proc), sdr, name="LearnMate SDR", logger=logger
     )
 
-    await ctx.connect()
-
 
 # -------------------------------------------------- #
 #                     Main Runner                    #
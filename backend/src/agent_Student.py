@@ -1,23 +1,20 @@
 import logging
 import os
-import json
 from typing import List, Optional
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
-    tokenize,
 )
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from sentence_chunking import ClauseTokenizer
 
 # -------------------------------------------------- #
 #                        Setup                        #
@@ -37,8 +34,8 @@ CONTENT_PATH = os.path.join(
 # -------------------------------------------------- #
 def load_tutor_content():
     try:
-        with open(CONTENT_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(CONTENT_PATH, "rb") as f:
+            return orjson.loads(f.read())
     except Exception:
         return []
 
@@ -46,54 +43,65 @@ def load_tutor_content():
 # -------------------------------------------------- #
 #                    Tutor Agent                     #
 # -------------------------------------------------- #
+TUTOR_INSTRUCTIONS = (
+    "You are LearnMate — a friendly, simple learning assistant.\n\n"
+    "Your job:\n"
+    " 1. Greet warmly and ask which learning mode the user wants.\n"
+    " 2. Support 3 learning modes:\n"
+    "      - learn → explain the concept\n"
+    "      - quiz → ask questions\n"
+    "      - teach_back → user explains and you give feedback\n"
+    " 3. Use ONLY the JSON content file provided.\n"
+    " 4. After user chooses mode → ask which concept (variables, loops).\n"
+    " 5. User can switch modes anytime.\n\n"
+    "Keep responses short, helpful, and friendly.\n"
+)
+
+
 class TutorAgent(Agent):
-    def __init__(self):
-        self.content = load_tutor_content()
+    def __init__(self, content: Optional[List[dict]] = None):
+        if content is None:
+            content = load_tutor_content()
+        self.content = content
+        self.concepts_by_id = {}
+        for item in content:
+            concept_id = item.get("id")
+            if concept_id is not None:
+                # first entry wins on duplicate ids, as the old scan did
+                self.concepts_by_id.setdefault(concept_id, item)
         self.mode = None          # "learn" / "quiz" / "teach_back"
         self.current_concept = None
 
-        instructions = (
-            "You are LearnMate — a friendly, simple learning assistant.\n\n"
-            "Your job:\n"
-            " 1. Greet warmly and ask which learning mode the user wants.\n"
-            " 2. Support 3 learning modes:\n"
-            "      - learn → explain the concept\n"
-            "      - quiz → ask questions\n"
-            "      - teach_back → user explains and you give feedback\n"
-            " 3. Use ONLY the JSON content file provided.\n"
-            " 4. After user chooses mode → ask which concept (variables, loops).\n"
-            " 5. User can switch modes anytime.\n\n"
-            "Keep responses short, helpful, and friendly.\n"
-        )
-
-        super().__init__(instructions=instructions, tools=[])
+        super().__init__(instructions=TUTOR_INSTRUCTIONS, tools=[])
 
     # Retrieve concept from JSON content
     def get_concept(self, concept_id):
-        for item in self.content:
-            if item["id"] == concept_id:
-                return item
-        return None
+        return self.concepts_by_id.get(concept_id)
 
 
 # -------------------------------------------------- #
 #                Single Voice (No Switching)         #
 # -------------------------------------------------- #
-def pick_voice(agent: TutorAgent):
+def pick_voice():
     # Only one default voice now
     return murf.TTS(
         voice="en-US-matthew",
         style="Conversation",
-        tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
+        tokenizer=ClauseTokenizer(),
         text_pacing=True,
     )
 
 
 # -------------------------------------------------- #
-#                     Prewarm VAD                    #
+#        Prewarm VAD, Tutor Content + Voice          #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    proc.userdata["tutor_content"] = load_tutor_content()
+    prewarm_plugins(
+        proc,
+        pick_voice(),
+        stt_kwargs={"language": "en"},
+    )
 
 
 # -------------------------------------------------- #
@@ -103,42 +111,12 @@ async def entrypoint(ctx: JobContext):
 
     ctx.log_context_fields = {"room": ctx.room.name}
 
-    tutor = TutorAgent()
+    tutor = TutorAgent(content=ctx.proc.userdata["tutor_content"])
 
-    # Single static voice
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-        llm=google.LLM(model="gemini-2.5-flash"),
-        tts=pick_voice(tutor),
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
+    await run_session(
+        ctx, make_session(ctx.proc), tutor, name="LearnMate", logger=logger
     )
 
-    # Usage tracking
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"LearnMate usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    # Start the session
-    await session.start(
-        agent=tutor,
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC()
-        ),
-    )
-
-    await ctx.connect()
-
 
 # -------------------------------------------------- #
 #                     Main Runner                    #
@@ -1,31 +1,34 @@
+import asyncio
 import logging
 import os
-import json
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
-    tokenize,
     function_tool,
     RunContext,
 )
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from json_io import write_json_atomic
+from sentence_chunking import ClauseTokenizer
 
 logger = logging.getLogger("starbricks_agent")
 
 load_dotenv(".env.local")
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ORDER_DIR = os.path.join(BASE_DIR, "starbricks_orders")
+os.makedirs(ORDER_DIR, exist_ok=True)
+
 
 # -------------------------------------------------- #
 #    TOOL: Save StarBricks-style coffee orders       #
@@ -49,16 +52,14 @@ async def save_starbricks_order(
         "customer_name": customer_name,
     }
 
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    order_dir = os.path.join(base_dir, "starbricks_orders")
-    os.makedirs(order_dir, exist_ok=True)
+    filename = f"sb_order_{datetime.now(timezone.utc):%Y-%m-%dT%H-%M-%S}.json"
+    filepath = os.path.join(ORDER_DIR, filename)
 
-    timestamp = datetime.utcnow().isoformat(timespec="seconds").replace(":", "-")
-    filename = f"sb_order_{timestamp}.json"
-    filepath = os.path.join(order_dir, filename)
-
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(order_payload, f, indent=2, ensure_ascii=False)
+    await asyncio.to_thread(
+        write_json_atomic,
+        filepath,
+        orjson.dumps(order_payload, option=orjson.OPT_INDENT_2),
+    )
 
     return f"saved:{filepath}"
 
@@ -66,37 +67,47 @@ async def save_starbricks_order(
 # -------------------------------------------------- #
 #      AGENT PERSONA — STARBRICKS BARISTA            #
 # -------------------------------------------------- #
+STARBRICKS_INSTRUCTIONS = (
+    "You are a cheerful barista at the premium coffee shop **StarBricks**. "
+    "Start by welcoming the customer warmly: 'Welcome to StarBricks!' "
+    "Help them build a full coffee order with the following structure:\n"
+    "{\n"
+    '  "beverage": "e.g. Latte, Cappuccino, Americano, Mocha",\n'
+    '  "size": "Tall, Grande, or Venti",\n'
+    '  "milk": "Whole, Skim, 2%, Oat, Soy, Almond",\n'
+    '  "customizations": ["Extra shot", "Vanilla syrup", "Caramel drizzle", "Whipped cream", etc.],\n'
+    '  "customer_name": "Their name"\n'
+    "}\n"
+    "Ask short, friendly clarification questions until all fields are filled. "
+    "Confirm everything clearly before calling:\n"
+    "`save_starbricks_order(beverage, size, milk, customizations, customer_name)`\n"
+    "After saving the order, give the customer a warm thank-you message including "
+    "their name and the file path returned by the tool. "
+    "Do NOT respond to harmful, unsafe, or illegal requests."
+)
+
+
 class StarBricksAssistant(Agent):
     def __init__(self) -> None:
-
         super().__init__(
-            instructions=(
-                "You are a cheerful barista at the premium coffee shop **StarBricks**. "
-                "Start by welcoming the customer warmly: 'Welcome to StarBricks!' "
-                "Help them build a full coffee order with the following structure:\n"
-                "{\n"
-                '  "beverage": "e.g. Latte, Cappuccino, Americano, Mocha",\n'
-                '  "size": "Tall, Grande, or Venti",\n'
-                '  "milk": "Whole, Skim, 2%, Oat, Soy, Almond",\n'
-                '  "customizations": ["Extra shot", "Vanilla syrup", "Caramel drizzle", "Whipped cream", etc.],\n'
-                '  "customer_name": "Their name"\n'
-                "}\n"
-                "Ask short, friendly clarification questions until all fields are filled. "
-                "Confirm everything clearly before calling:\n"
-                "`save_starbricks_order(beverage, size, milk, customizations, customer_name)`\n"
-                "After saving the order, give the customer a warm thank-you message including "
-                "their name and the file path returned by the tool. "
-                "Do NOT respond to harmful, unsafe, or illegal requests."
-            ),
+            instructions=STARBRICKS_INSTRUCTIONS,
             tools=[save_starbricks_order],
         )
 
 
 # -------------------------------------------------- #
-#                PREWARMING / VAD                    #
+#          PREWARMING / VAD + PLUGIN CLIENTS         #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    prewarm_plugins(
+        proc,
+        murf.TTS(
+            voice="en-US-matthew",
+            style="Conversation",
+            tokenizer=ClauseTokenizer(),
+            text_pacing=True,
+        ),
+    )
 
 
 # -------------------------------------------------- #
@@ -108,45 +119,14 @@ async def entrypoint(ctx: JobContext):
         "room": ctx.room.name,
     }
 
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-
-        llm=google.LLM(model="gemini-2.5-flash"),
-
-        tts=murf.TTS(
-            voice="en-US-matthew",
-            style="Conversation",
-            tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
-            text_pacing=True,
-        ),
-
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
-    )
-
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
-
-    async def show_usage():
-        logger.info(f"StarBricks usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=StarBricksAssistant(),
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC()
-        ),
+    await run_session(
+        ctx,
+        make_session(ctx.proc),
+        StarBricksAssistant(),
+        name="StarBricks",
+        logger=logger,
     )
 
-    await ctx.connect()
-
 
 if __name__ == "__main__":
     cli.run_app(
@@ -1,49 +1,107 @@
+import asyncio
 import logging
 import os
-import json
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
 
+import orjson
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
-    AgentSession,
     JobContext,
     JobProcess,
-    MetricsCollectedEvent,
-    RoomInputOptions,
     WorkerOptions,
     cli,
-    metrics,
-    tokenize,
     function_tool,
     RunContext,
 )
-from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
+from livekit.plugins import murf
+
+from _session_factory import make_session, prewarm_plugins, run_session
+from json_io import write_json_atomic
+from sentence_chunking import ClauseTokenizer
 
 logger = logging.getLogger("wellness_companion_agent")
 
 load_dotenv(".env.local")
 
 
-WELLNESS_LOG_FILE = os.path.join(
-    os.path.abspath(os.path.join(os.path.dirname(__file__), "..")),
-    "wellness_log.json"
-)
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+WELLNESS_LOG_FILE = os.path.join(BASE_DIR, "wellness_log.ndjson")
+# Check-ins used to be kept as one JSON array; it is converted on first load.
+LEGACY_WELLNESS_LOG_FILE = os.path.join(BASE_DIR, "wellness_log.json")
+
+# How far back from EOF to look per read when fetching the latest check-in.
+TAIL_READ_SIZE = 4096
 
 
 # -------------------------------------------------- #
-#   Utility: Load previous wellness check-ins        #
+#   Utility: Load the latest wellness check-in       #
 # -------------------------------------------------- #
-def load_wellness_history() -> List[dict]:
+def _migrate_legacy_log() -> None:
+    """Convert an old wellness_log.json history to NDJSON if there is no log yet."""
+    if os.path.exists(WELLNESS_LOG_FILE):
+        return
+    if not os.path.exists(LEGACY_WELLNESS_LOG_FILE):
+        return
+    try:
+        with open(LEGACY_WELLNESS_LOG_FILE, "rb") as f:
+            history = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        logger.warning("Could not read %s; not migrating it", LEGACY_WELLNESS_LOG_FILE)
+        return
+    if not isinstance(history, list):
+        logger.warning("%s is not a list; not migrating it", LEGACY_WELLNESS_LOG_FILE)
+        return
+    lines = (orjson.dumps(e, option=orjson.OPT_APPEND_NEWLINE) for e in history)
+    write_json_atomic(WELLNESS_LOG_FILE, b"".join(lines))
+    logger.info("Migrated %d check-ins to %s", len(history), WELLNESS_LOG_FILE)
+
+
+def _lines_from_end(f) -> Iterator[bytes]:
+    """Yield the lines of a binary file, last first, reading backwards from EOF."""
+    pos = f.seek(0, os.SEEK_END)
+    head = b""
+    while pos > 0:
+        step = min(TAIL_READ_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        lines = (f.read(step) + head).split(b"\n")
+        # the first piece may continue in the block before this one
+        head = lines[0]
+        yield from reversed(lines[1:])
+    yield head
+
+
+def load_last_wellness_entry() -> Optional[dict]:
+    """Return the last complete NDJSON check-in, scanning backwards from EOF."""
+    try:
+        _migrate_legacy_log()
+    except OSError:
+        logger.exception("Failed to migrate %s", LEGACY_WELLNESS_LOG_FILE)
     if not os.path.exists(WELLNESS_LOG_FILE):
-        return []
+        return None
     try:
-        with open(WELLNESS_LOG_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return []
+        with open(WELLNESS_LOG_FILE, "rb") as f:
+            for line in _lines_from_end(f):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    return orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # e.g. a partial append cut short by a crash; the line
+                    # before it is still a complete check-in
+                    logger.debug("Skipping unreadable wellness log line %r", line[:80])
+    except OSError:
+        logger.debug("Failed to read %s", WELLNESS_LOG_FILE, exc_info=True)
+    return None
+
+
+def _append_json_line_sync(path: str, payload: bytes):
+    with open(path, "ab") as f:
+        f.write(payload)
 
 
 # -------------------------------------------------- #
@@ -58,10 +116,10 @@ async def save_wellness_checkin(
     objectives: List[str],
     summary: str,
 ) -> str:
-    """Store a daily wellness check-in to a JSON log file."""
+    """Store a daily wellness check-in to an NDJSON log file."""
 
     entry = {
-        "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+        "timestamp": datetime.now(timezone.utc),
         "mood": mood,
         "energy": energy,
         "stressors": stressors or "",
@@ -69,11 +127,14 @@ async def save_wellness_checkin(
         "summary": summary,
     }
 
-    history = load_wellness_history()
-    history.append(entry)
-
-    with open(WELLNESS_LOG_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, indent=2, ensure_ascii=False)
+    await asyncio.to_thread(
+        _append_json_line_sync,
+        WELLNESS_LOG_FILE,
+        orjson.dumps(
+            entry,
+            option=orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_APPEND_NEWLINE,
+        ),
+    )
 
     return "saved"
 
@@ -81,14 +142,42 @@ async def save_wellness_checkin(
 # -------------------------------------------------- #
 #   AGENT PERSONA — WELLNESS CHECK-IN COMPANION      #
 # -------------------------------------------------- #
+# Split around the past-check-in context so only that small segment is
+# built per session.
+WELLNESS_INSTRUCTIONS_PREFIX = (
+    "You are a calm, supportive Daily Health & Wellness Companion.\n"
+    "Your job is to conduct gentle, short daily check-ins. Avoid medical or diagnostic language.\n\n"
+
+    "=== CHECK-IN FLOW ===\n"
+    "1. Ask about today's mood.\n"
+    "2. Ask about today's energy level.\n"
+    "3. Ask if anything is stressing them out.\n"
+    "4. Ask for 1–3 goals or intentions for the day.\n"
+    "5. Provide small, grounded, non-medical advice.\n"
+    "6. Give a recap of mood + main goals.\n"
+    "7. Call the tool:\n"
+    "`save_wellness_checkin(mood, energy, stressors, objectives, summary)`\n\n"
+
+    "=== ADVICE STYLE ===\n"
+    "- Offer small, actionable suggestions.\n"
+    "- Encourage pacing, breaks, and simple self-care.\n"
+    "- Never give medical, diagnostic, or clinical guidance.\n\n"
+
+    "=== OPTIONAL CONTEXT FROM PAST CHECK-INS ===\n"
+)
+
+WELLNESS_INSTRUCTIONS_SUFFIX = (
+    "\n\n"
+    "Keep responses warm, concise, and human-like. Proceed step-by-step."
+)
+
+
 class WellnessCompanion(Agent):
-    def __init__(self) -> None:
+    def __init__(self, last: Optional[dict] = None) -> None:
 
-        previous_entries = load_wellness_history()
         last_ref = ""
 
-        if previous_entries:
-            last = previous_entries[-1]
+        if last:
             last_ref = (
                 f"Last time you mentioned your mood was '{last['mood']}' and "
                 f"your energy was '{last['energy']}'. "
@@ -97,38 +186,25 @@ class WellnessCompanion(Agent):
 
         super().__init__(
             instructions=(
-                "You are a calm, supportive Daily Health & Wellness Companion.\n"
-                "Your job is to conduct gentle, short daily check-ins. Avoid medical or diagnostic language.\n\n"
-
-                "=== CHECK-IN FLOW ===\n"
-                "1. Ask about today's mood.\n"
-                "2. Ask about today's energy level.\n"
-                "3. Ask if anything is stressing them out.\n"
-                "4. Ask for 1–3 goals or intentions for the day.\n"
-                "5. Provide small, grounded, non-medical advice.\n"
-                "6. Give a recap of mood + main goals.\n"
-                "7. Call the tool:\n"
-                "`save_wellness_checkin(mood, energy, stressors, objectives, summary)`\n\n"
-
-                "=== ADVICE STYLE ===\n"
-                "- Offer small, actionable suggestions.\n"
-                "- Encourage pacing, breaks, and simple self-care.\n"
-                "- Never give medical, diagnostic, or clinical guidance.\n\n"
-
-                f"=== OPTIONAL CONTEXT FROM PAST CHECK-INS ===\n"
-                f"{last_ref}\n\n"
-
-                "Keep responses warm, concise, and human-like. Proceed step-by-step."
+                WELLNESS_INSTRUCTIONS_PREFIX + last_ref + WELLNESS_INSTRUCTIONS_SUFFIX
             ),
             tools=[save_wellness_checkin],
         )
 
 
 # -------------------------------------------------- #
-#                PREWARMING / VAD                    #
+#            PREWARMING / VAD + PLUGINS              #
 # -------------------------------------------------- #
 def prewarm(proc: JobProcess):
-    proc.userdata["vad_model"] = silero.VAD.load()
+    prewarm_plugins(
+        proc,
+        murf.TTS(
+            voice="en-US-matthew",
+            style="Conversation",
+            tokenizer=ClauseTokenizer(),
+            text_pacing=True,
+        ),
+    )
 
 
 # -------------------------------------------------- #
@@ -140,45 +216,18 @@ async def entrypoint(ctx: JobContext):
         "room": ctx.room.name,
     }
 
-    session = AgentSession(
-        stt=deepgram.STT(model="nova-3"),
-
-        llm=google.LLM(model="gemini-2.5-flash"),
-
-        tts=murf.TTS(
-            voice="en-US-matthew",
-            style="Conversation",
-            tokenizer=tokenize.basic.SentenceTokenizer(min_sentence_len=2),
-            text_pacing=True,
-        ),
-
-        turn_detection=MultilingualModel(),
-        vad=ctx.proc.userdata["vad_model"],
-        preemptive_generation=True,
-    )
-
-    usage = metrics.UsageCollector()
-
-    @session.on("metrics_collected")
-    def _collect(ev: MetricsCollectedEvent):
-        metrics.log_metrics(ev.metrics)
-        usage.collect(ev.metrics)
+    # read per session: processes are warmed ahead of time, so a check-in
+    # loaded in prewarm can miss the caller's previous session
+    last = await asyncio.to_thread(load_last_wellness_entry)
 
-    async def show_usage():
-        logger.info(f"Wellness Companion usage summary: {usage.get_summary()}")
-
-    ctx.add_shutdown_callback(show_usage)
-
-    await session.start(
-        agent=WellnessCompanion(),
-        room=ctx.room,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC()
-        ),
+    await run_session(
+        ctx,
+        make_session(ctx.proc),
+        WellnessCompanion(last=last),
+        name="Wellness Companion",
+        logger=logger,
     )
 
-    await ctx.connect()
-
 
 if __name__ == "__main__":
     cli.run_app(
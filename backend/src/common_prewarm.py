@@ -0,0 +1,16 @@
+import functools
+
+from livekit.plugins import silero
+
+
+@functools.lru_cache(maxsize=1)
+def get_vad() -> silero.VAD:
+    """
+    Load the Silero VAD for this process.
+
+    Every agent script calls this from its prewarm, which LiveKit runs once
+    per job process before that process's single job. The cache only guards
+    against a second call within the same process; it does not share the
+    model between jobs.
+    """
+    return silero.VAD.load()
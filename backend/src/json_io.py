@@ -0,0 +1,76 @@
+import asyncio
+import contextlib
+import os
+import stat
+import tempfile
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+# os.umask can only be read by setting it, so do that once at import rather
+# than from the worker threads the writes run on
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+# what open(path, "w") would have created
+_NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def write_json_atomic(path: str, payload: bytes) -> None:
+    """
+    Write `payload` (already serialized JSON) to `path` through a sibling
+    temp file that is fsynced and renamed over the target, so a crash
+    mid-write never leaves a truncated file. The target keeps its permission
+    bits; a new file gets the mode the process umask allows, not mkstemp's
+    fixed 0600.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = _NEW_FILE_MODE
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        # a failed cleanup must not hide the error that got us here
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+class CoalescingFlusher:
+    """
+    Runs `flush` from a single background task once a burst of `mark_dirty`
+    calls has settled for `delay` seconds, instead of once per call. Marks that
+    arrive while a flush is running trigger one more flush.
+    """
+
+    def __init__(self, flush: Callable[[], Awaitable[None]], delay: float) -> None:
+        self._flush = flush
+        self._delay = delay
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._delay)
+        while self._dirty:
+            self._dirty = False
+            await self._flush()
+
+    async def flush_now(self) -> None:
+        """Wait for a running flush, then flush anything still marked dirty."""
+        task = self._task
+        if task is not None and not task.done():
+            await task
+        if self._dirty:
+            self._dirty = False
+            await self._flush()
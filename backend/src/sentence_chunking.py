@@ -0,0 +1,78 @@
+import re
+from typing import List, Optional, Tuple
+
+from livekit.agents.tokenize import BufferedSentenceStream, SentenceStream, basic
+
+# A sentence runs up to terminal punctuation (plus an optional closing quote)
+# that is followed by the end of the buffer or by whitespace and a character
+# that is not a lowercase letter. A period does not end a sentence after a
+# common title ("Dr."), a single letter ("U.S.", "e.g.") or inside a decimal
+# ("3.50"); "Inc. in" continues because the next word is lowercase. Runs of
+# non-punctuation are consumed whole, so the lookbehinds are only tried at
+# punctuation. Compiled once; re patterns are safe to share between sessions.
+_SENTENCE_RE = re.compile(
+    r"\S(?:[^.!?]+|[.!?])*?(?:(?:[!?]|(?<!\bMr)(?<!\bMrs)(?<!\bMs)(?<!\bDr)(?<!\bSt)(?<!\bProf)"
+    r"(?<!\bJr)(?<!\bSr)(?<!\b[A-Za-z])\.)[.!?]*[\"\u201d]?"
+    r"(?=\s+(?![a-z])|\s*$)|$)",
+    re.DOTALL,
+)
+_WORD_RE = re.compile(r"\S+")
+
+
+class ClauseTokenizer(basic.SentenceTokenizer):
+    """
+    Sentence tokenizer that hands TTS shorter chunks so audio can start
+    before the LLM has finished a full sentence.
+
+    A chunk is flushed on sentence punctuation, on a comma once
+    `min_clause_words` words are buffered, or once `max_clause_words` words
+    are buffered.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_clause_words: int = 4,
+        max_clause_words: int = 40,
+        min_sentence_len: int = 2,
+        stream_context_len: int = 10,
+    ) -> None:
+        super().__init__(
+            min_sentence_len=min_sentence_len,
+            stream_context_len=stream_context_len,
+        )
+        self._min_clause_words = min_clause_words
+        self._max_clause_words = max_clause_words
+        self._min_sentence_len = min_sentence_len
+        self._stream_context_len = stream_context_len
+
+    def _split_clauses(self, text: str) -> List[Tuple[str, int, int]]:
+        # each clause is (words joined by single spaces, start, end); the
+        # offsets point into `text` so the stream can cut its buffer exactly,
+        # even when the LLM puts double spaces or blank lines inside a sentence
+        clauses: List[Tuple[str, int, int]] = []
+        for sentence in _SENTENCE_RE.finditer(text):
+            words: List[str] = []
+            start = 0
+            for word in _WORD_RE.finditer(text, sentence.start(), sentence.end()):
+                if not words:
+                    start = word.start()
+                words.append(word.group())
+                if len(words) >= self._max_clause_words or (
+                    words[-1].endswith(",") and len(words) >= self._min_clause_words
+                ):
+                    clauses.append((" ".join(words), start, word.end()))
+                    words = []
+            if words:
+                clauses.append((" ".join(words), start, word.end()))
+        return clauses
+
+    def tokenize(self, text: str, *, language: Optional[str] = None) -> List[str]:
+        return [clause for clause, _, _ in self._split_clauses(text)]
+
+    def stream(self, *, language: Optional[str] = None) -> SentenceStream:
+        return BufferedSentenceStream(
+            tokenizer=self._split_clauses,
+            min_token_len=self._min_sentence_len,
+            min_ctx_len=self._stream_context_len,
+        )
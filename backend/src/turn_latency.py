@@ -0,0 +1,88 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from livekit.agents import UserInputTranscribedEvent, UserStateChangedEvent, metrics
+
+logger = logging.getLogger("turn_latency")
+
+# Turns whose LLM reply was cancelled (e.g. preemptive generation) never get a
+# TTS metric, so only keep the most recent ones around.
+MAX_TRACKED_TURNS = 32
+
+
+class TurnLatencyTracker:
+    """
+    Joins the EOU, LLM and TTS metrics LiveKit emits for a speech_id and logs
+    one line per turn with the latency of each pipeline stage.
+
+    Also measures time-to-final-segment (TTFS): the gap between VAD end of
+    speech and the first final transcript after it. Streaming STT reports a
+    duration of 0, so this is the only signal of STT responsiveness.
+    """
+
+    def __init__(self) -> None:
+        self._turns: OrderedDict[str, Dict[str, float]] = OrderedDict()
+        self._end_of_speech_ns: Optional[int] = None
+        self._ttfs_count = 0
+        self._ttfs_total_ms = 0.0
+        self._ttfs_max_ms = 0.0
+
+    def on_user_state_changed(self, ev: UserStateChangedEvent) -> None:
+        if ev.new_state == "speaking":
+            self._end_of_speech_ns = None
+        elif ev.old_state == "speaking":
+            self._end_of_speech_ns = time.monotonic_ns()
+
+    def on_user_input_transcribed(self, ev: UserInputTranscribedEvent) -> None:
+        if not ev.is_final or self._end_of_speech_ns is None:
+            return
+        ttfs_ms = (time.monotonic_ns() - self._end_of_speech_ns) / 1e6
+        self._end_of_speech_ns = None
+
+        self._ttfs_count += 1
+        self._ttfs_total_ms += ttfs_ms
+        self._ttfs_max_ms = max(self._ttfs_max_ms, ttfs_ms)
+        logger.info("ttfs_ms=%.1f", ttfs_ms)
+
+    def ttfs_summary(self) -> str:
+        if not self._ttfs_count:
+            return "ttfs: no samples"
+        avg_ms = self._ttfs_total_ms / self._ttfs_count
+        return (
+            f"ttfs: avg={avg_ms:.1f}ms max={self._ttfs_max_ms:.1f}ms "
+            f"turns={self._ttfs_count}"
+        )
+
+    def collect(self, m: metrics.AgentMetrics) -> None:
+        speech_id = getattr(m, "speech_id", None)
+        if not speech_id:
+            return
+
+        if isinstance(m, metrics.EOUMetrics):
+            stage, value = "eou_delay", m.end_of_utterance_delay
+        elif isinstance(m, metrics.LLMMetrics):
+            stage, value = "llm_ttft", m.ttft
+        elif isinstance(m, metrics.TTSMetrics):
+            stage, value = "tts_ttfb", m.ttfb
+        else:
+            return
+
+        turn = self._turns.setdefault(speech_id, {})
+        # only the first TTS segment of a reply decides when audio starts
+        turn.setdefault(stage, value)
+        if len(self._turns) > MAX_TRACKED_TURNS:
+            self._turns.popitem(last=False)
+
+        if len(turn) == 3:
+            del self._turns[speech_id]
+            logger.info(
+                "turn latency speech_id=%s eou_delay=%.3fs llm_ttft=%.3fs "
+                "tts_ttfb=%.3fs total=%.3fs",
+                speech_id,
+                turn["eou_delay"],
+                turn["llm_ttft"],
+                turn["tts_ttfb"],
+                sum(turn.values()),
+            )
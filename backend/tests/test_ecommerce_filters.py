@@ -0,0 +1,25 @@
+from agent_Ecommerce import apply_filters
+
+
+def _ids(products):
+    return [p["id"] for p in products]
+
+
+def test_apply_filters_without_filters_returns_catalog() -> None:
+    assert _ids(apply_filters({})) == ["mug-001", "mug-002", "hoodie-001", "tshirt-001"]
+
+
+def test_apply_filters_combines_indexes_in_catalog_order() -> None:
+    assert _ids(apply_filters({"color": "white"})) == ["mug-001", "tshirt-001"]
+    assert _ids(apply_filters({"max_price": 950})) == [
+        "mug-001",
+        "mug-002",
+        "tshirt-001",
+    ]
+    assert _ids(apply_filters({"category": "mug", "max_price": 900})) == ["mug-001"]
+    assert apply_filters({"category": "mug", "color": "black"}) == []
+
+
+def test_apply_filters_ignores_non_string_values() -> None:
+    assert apply_filters({"color": ["white", "black"]}) == []
+    assert apply_filters({"category": {"name": "mug"}, "max_price": 5000}) == []
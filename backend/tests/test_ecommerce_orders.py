@@ -0,0 +1,27 @@
+import orjson
+import pytest
+
+import agent_Ecommerce
+
+
+@pytest.fixture
+def orders_file(tmp_path, monkeypatch):
+    path = tmp_path / "orders.json"
+    monkeypatch.setattr(agent_Ecommerce, "ORDERS_FILE", str(path))
+    monkeypatch.setattr(agent_Ecommerce, "ORDERS_LOCK_FILE", str(path) + ".lock")
+    monkeypatch.setattr(agent_Ecommerce, "ORDERS_SEQ_FILE", str(path) + ".seq")
+    return path
+
+
+def test_order_numbers_continue_after_highest_saved_id(orders_file) -> None:
+    orders_file.write_bytes(orjson.dumps([{"id": "order-007"}, {"id": "order-002"}]))
+    assert agent_Ecommerce._reserve_order_number() == 8
+    # the counter is shared through the sidecar, not the orders still in memory
+    assert agent_Ecommerce._reserve_order_number() == 9
+
+
+def test_appending_orders_keeps_orders_saved_by_other_rooms(orders_file) -> None:
+    agent_Ecommerce._append_orders_sync([{"id": "order-001"}])
+    agent_Ecommerce._append_orders_sync([{"id": "order-002"}])
+    saved = orjson.loads(orders_file.read_bytes())
+    assert [o["id"] for o in saved] == ["order-001", "order-002"]
@@ -0,0 +1,34 @@
+import orjson
+import pytest
+
+import agent_Fraud
+
+
+@pytest.fixture
+def fraud_db(tmp_path, monkeypatch):
+    path = tmp_path / "fraud_cases.json"
+    monkeypatch.setattr(agent_Fraud, "FRAUD_DB_PATH", str(path))
+    monkeypatch.setattr(
+        agent_Fraud,
+        "_FRAUD_CACHE",
+        {"mtime": None, "cases": [], "by_username": {}, "validated": False},
+    )
+    return path
+
+
+def test_existing_db_is_parsed_on_first_lookup(fraud_db) -> None:
+    fraud_db.write_bytes(orjson.dumps([{"case_id": "REAL-1", "username": "amy"}]))
+
+    agent_Fraud.ensure_sample_db()
+    assert agent_Fraud._FRAUD_CACHE["mtime"] is None
+
+    assert agent_Fraud.find_case_by_username("amy")["case_id"] == "REAL-1"
+
+
+def test_invalid_db_is_replaced_with_samples_on_first_load(fraud_db) -> None:
+    fraud_db.write_bytes(b"{not json")
+
+    agent_Fraud.ensure_sample_db()
+    assert fraud_db.read_bytes() == b"{not json"
+
+    assert agent_Fraud.find_case_by_username("sam")["case_id"] == "CASE-1002"
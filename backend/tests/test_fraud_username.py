@@ -0,0 +1,57 @@
+import pytest
+
+from agent_Fraud import _index_by_username, extract_username
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        ("My username is Sam", "sam"),
+        ("username: neha.r", "neha.r"),
+        ("It is Megha.S.", "megha.s"),
+        ("I'm  bob!", "bob"),
+        ("USERNAME RAJ", "raj"),
+        ("sam", "sam"),
+        ("Neha.R.", "neha.r"),
+        ("username-sam", "sam"),
+    ],
+)
+def test_extract_username_patterns(raw: str, expected: str) -> None:
+    assert extract_username(raw) == expected
+
+
+def test_extract_username_falls_back_to_last_token() -> None:
+    assert extract_username("hello there friend") == "friend"
+    assert extract_username("") == ""
+
+
+def test_extract_username_prefers_explicit_username_phrase() -> None:
+    assert extract_username("I am calling about my card, username is neha") == "neha"
+
+
+@pytest.mark.parametrize(
+    ("raw", "expected"),
+    [
+        # an earlier pattern wins over a later one that matches further left
+        ("it is me, i am sam", "sam"),
+        ("i'm sam, i am bob", "bob"),
+        ("username sam, username is bob", "bob"),
+    ],
+)
+def test_extract_username_tries_patterns_in_order(raw: str, expected: str) -> None:
+    assert extract_username(raw) == expected
+
+
+def test_index_by_username_skips_malformed_cases() -> None:
+    cases = [
+        "not-a-case",
+        {"case_id": "REAL-1", "username": None},
+        {"case_id": "REAL-2", "username": " Amy "},
+        {"case_id": "REAL-3", "username": "amy"},
+    ]
+
+    index = _index_by_username(cases)
+
+    assert list(index) == ["amy"]
+    assert index["amy"]["case_id"] == "REAL-2"
+    assert _index_by_username({"username": "amy"}) == {}
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import stat
+
+import pytest
+
+from json_io import CoalescingFlusher, write_json_atomic
+
+
+def _mode(path) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_follows_umask(tmp_path) -> None:
+    umask = os.umask(0)
+    os.umask(umask)
+    path = tmp_path / "new.json"
+
+    write_json_atomic(str(path), b'{"a": 1}')
+
+    assert path.read_bytes() == b'{"a": 1}'
+    assert _mode(path) == 0o666 & ~umask
+
+
+def test_existing_file_keeps_its_mode(tmp_path) -> None:
+    path = tmp_path / "private.json"
+    path.write_bytes(b"{}")
+    os.chmod(path, 0o600)
+
+    write_json_atomic(str(path), b"[]")
+
+    assert path.read_bytes() == b"[]"
+    assert _mode(path) == 0o600
+    assert [p.name for p in tmp_path.iterdir()] == ["private.json"]
+
+
+def test_failed_cleanup_keeps_the_original_error(tmp_path, monkeypatch) -> None:
+    def fail_replace(src, dst):
+        raise PermissionError("replace failed")
+
+    def fail_unlink(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "replace", fail_replace)
+    monkeypatch.setattr(os, "unlink", fail_unlink)
+
+    with pytest.raises(PermissionError, match="replace failed"):
+        write_json_atomic(str(tmp_path / "x.json"), b"{}")
+
+
+@pytest.mark.asyncio
+async def test_flusher_coalesces_a_burst_into_one_flush() -> None:
+    calls = []
+
+    async def flush() -> None:
+        calls.append(1)
+
+    flusher = CoalescingFlusher(flush, delay=0.01)
+    for _ in range(3):
+        flusher.mark_dirty()
+    await asyncio.sleep(0.05)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_now_writes_pending_marks() -> None:
+    calls = []
+
+    async def flush() -> None:
+        calls.append(1)
+
+    flusher = CoalescingFlusher(flush, delay=0.01)
+    await flusher.flush_now()
+    assert calls == []
+
+    # waits for the scheduled flush instead of writing a second time
+    flusher.mark_dirty()
+    await flusher.flush_now()
+    assert calls == [1]
@@ -0,0 +1,26 @@
+from agent_Leads import build_faq_index, find_faq
+
+FAQ = [
+    {"q": "What does the company do?", "a": "We run movie promotions and events."},
+    {"q": "Do you publish pricing online?", "a": "No, contact us for a quote."},
+    {"q": "Where are you located?", "a": "Headquartered in Hyderabad."},
+]
+
+
+def test_find_faq_prefers_entry_matching_most_tokens() -> None:
+    entry = find_faq("Is your pricing published online?", FAQ)
+    assert entry is FAQ[1]
+
+
+def test_find_faq_uses_prebuilt_index() -> None:
+    index = build_faq_index(FAQ)
+    assert find_faq("Are you in Hyderabad?", FAQ, index) is FAQ[2]
+
+
+def test_find_faq_returns_none_without_match() -> None:
+    assert find_faq("hi", FAQ) is None
+    assert find_faq("pricing", []) is None
+
+
+def test_find_faq_matches_case_insensitively() -> None:
+    assert find_faq("WHERE is the office LOCATED", FAQ) is FAQ[2]
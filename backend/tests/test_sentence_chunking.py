@@ -0,0 +1,81 @@
+import pytest
+
+from sentence_chunking import ClauseTokenizer
+
+
+def test_splits_on_sentences_and_long_clauses() -> None:
+    tokenizer = ClauseTokenizer()
+    text = "Welcome in! We have a lovely caramel latte, a bold mocha, and tea."
+    assert tokenizer.tokenize(text) == [
+        "Welcome in!",
+        "We have a lovely caramel latte,",
+        "a bold mocha, and tea.",
+    ]
+
+
+def test_caps_chunk_length_in_words() -> None:
+    tokenizer = ClauseTokenizer(max_clause_words=5)
+    chunks = tokenizer.tokenize(" ".join(["word"] * 12) + ".")
+    assert [len(c.split()) for c in chunks] == [5, 5, 2]
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_clauses_in_order() -> None:
+    text = "Hello there! Pick a size, a milk, and any extras you like. Ready?"
+    stream = ClauseTokenizer().stream()
+    for word in text.split(" "):
+        stream.push_text(word + " ")
+    stream.end_input()
+
+    tokens = [ev.token async for ev in stream]
+    assert tokens == [
+        "Hello there!",
+        "Pick a size, a milk,",
+        "and any extras you like.",
+        "Ready?",
+    ]
+
+
+def test_keeps_decimals_and_titles_in_one_sentence() -> None:
+    tokenizer = ClauseTokenizer()
+    assert tokenizer.tokenize("Dr. Rao paid $3.50 today! Thanks") == [
+        "Dr. Rao paid $3.50 today!",
+        "Thanks",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_handles_double_spaces_and_blank_lines() -> None:
+    text = (
+        "Sure thing,  I can  add that to your order, and anything else you want"
+        " today? Here are the options:\n\n1. A smooth latte.\n2. A mocha."
+    )
+    stream = ClauseTokenizer().stream()
+    for word in text.split(" "):
+        stream.push_text(word + " ")
+    stream.end_input()
+
+    tokens = [ev.token async for ev in stream]
+    assert tokens[:2] == [
+        "Sure thing, I can add that to your order,",
+        "and anything else you want today?",
+    ]
+    # every word reaches TTS exactly once, in order
+    assert " ".join(tokens) == " ".join(text.split())
+
+
+def test_keeps_abbreviations_in_one_sentence() -> None:
+    tokenizer = ClauseTokenizer()
+    text = (
+        "Try a syrup, e.g. vanilla or hazelnut. Beans come from Acme Inc. in"
+        " the U.S. today. That is, i.e. fresh."
+    )
+    assert tokenizer.tokenize(text) == [
+        "Try a syrup, e.g. vanilla or hazelnut.",
+        "Beans come from Acme Inc. in the U.S. today.",
+        "That is, i.e. fresh.",
+    ]
+    assert tokenizer.tokenize("Ask Prof. Iyer or J. Smith. Mr. Rao left!") == [
+        "Ask Prof. Iyer or J. Smith.",
+        "Mr. Rao left!",
+    ]
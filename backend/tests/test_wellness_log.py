@@ -0,0 +1,65 @@
+import orjson
+import pytest
+
+import agent_wellness
+from agent_wellness import load_last_wellness_entry
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    path = tmp_path / "wellness_log.ndjson"
+    monkeypatch.setattr(agent_wellness, "WELLNESS_LOG_FILE", str(path))
+    monkeypatch.setattr(
+        agent_wellness, "LEGACY_WELLNESS_LOG_FILE", str(tmp_path / "wellness_log.json")
+    )
+    return path
+
+
+def _lines(*entries) -> bytes:
+    return b"".join(orjson.dumps(e) + b"\n" for e in entries)
+
+
+def test_returns_none_without_log(log_file) -> None:
+    assert load_last_wellness_entry() is None
+    log_file.write_bytes(b"")
+    assert load_last_wellness_entry() is None
+
+
+def test_reads_last_entry_across_blocks(log_file, monkeypatch) -> None:
+    monkeypatch.setattr(agent_wellness, "TAIL_READ_SIZE", 8)
+    log_file.write_bytes(_lines({"mood": "tired"}, {"mood": "calm", "energy": "ok"}))
+    assert load_last_wellness_entry() == {"mood": "calm", "energy": "ok"}
+
+
+def test_skips_trailing_blank_lines(log_file, monkeypatch) -> None:
+    monkeypatch.setattr(agent_wellness, "TAIL_READ_SIZE", 4)
+    log_file.write_bytes(_lines({"mood": "tired"}, {"mood": "calm"}) + b"\n\n  \n")
+    assert load_last_wellness_entry() == {"mood": "calm"}
+
+
+def test_reads_last_line_longer_than_one_block(log_file, monkeypatch) -> None:
+    monkeypatch.setattr(agent_wellness, "TAIL_READ_SIZE", 16)
+    last = {"mood": "good", "summary": "x" * 100}
+    log_file.write_bytes(_lines({"mood": "tired"}, last))
+    assert load_last_wellness_entry() == last
+    # a single line spanning the whole file
+    log_file.write_bytes(_lines(last))
+    assert load_last_wellness_entry() == last
+
+
+def test_migrates_legacy_json_log_once(log_file) -> None:
+    legacy = log_file.with_name("wellness_log.json")
+    legacy.write_bytes(orjson.dumps([{"mood": "tired"}, {"mood": "calm"}]))
+
+    assert load_last_wellness_entry() == {"mood": "calm"}
+    assert log_file.read_bytes() == _lines({"mood": "tired"}, {"mood": "calm"})
+
+    # once the NDJSON log exists the legacy file is left alone
+    legacy.write_bytes(orjson.dumps([{"mood": "stale"}]))
+    assert load_last_wellness_entry() == {"mood": "calm"}
+
+
+def test_falls_back_past_a_partial_last_line(log_file, monkeypatch) -> None:
+    monkeypatch.setattr(agent_wellness, "TAIL_READ_SIZE", 8)
+    log_file.write_bytes(_lines({"mood": "tired"}, {"mood": "calm"}) + b'{"mood": "ha')
+    assert load_last_wellness_entry() == {"mood": "calm"}